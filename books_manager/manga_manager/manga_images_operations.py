@@ -3,15 +3,58 @@ import logging
 import os
 
 import cv2
+import img2pdf
 import numpy as np
-from PIL import Image, ImageFilter, ImageEnhance
+from PIL import Image, ImageEnhance
 from PIL.ImageFile import ImageFile
 
 from settings import FINAL_DOCUMENT_WIDTH, FINAL_DOCUMENT_HEIGHT, USE_SATURATION_FILTER, \
-    SATURATION_FACTOR, NOISE_THRESHOLD
+    SATURATION_FACTOR, NOISE_THRESHOLD, USE_OPENCL
 
 logger = logging.getLogger('_books_manager_')
 
+# libjpeg-turbo decoder, optional: JPEG files are decoded with Pillow when it is not installed
+try:
+    from turbojpeg import TurboJPEG, TJPF_RGB
+
+    _turbo_jpeg = TurboJPEG()
+except Exception:
+    _turbo_jpeg = None
+
+# Whether OpenCL is used in this process, resolved on first use by _opencl_enabled
+_opencl_state: bool | None = None
+
+# Guided filter from the OpenCV contrib modules, optional: bilateral/recursive filters are used without it
+_HAS_XIMGPROC = hasattr(cv2, 'ximgproc')
+
+# Images above this pixel count are denoised with the recursive filter instead of the bilateral one
+_LARGE_IMAGE_PIXELS = 2_000_000
+
+
+def limit_worker_threads() -> None:
+    """
+    Limit the native thread pools of a page worker process to a single thread.
+
+    The page pool already runs one worker per core, extra OpenCV threads would only oversubscribe the CPU.
+    """
+    cv2.setNumThreads(1)
+
+
+def _opencl_enabled() -> bool:
+    """
+    Check if the denoise and sharpen filters should run through OpenCV's OpenCL transparent API.
+
+    OpenCL is opt-in (USE_OPENCL) and only initialized, once, in the process that actually runs the filters.
+    """
+    global _opencl_state
+    if _opencl_state is None:
+        _opencl_state = USE_OPENCL and cv2.ocl.haveOpenCL()
+        if _opencl_state:
+            cv2.ocl.setUseOpenCL(True)
+        elif USE_OPENCL:
+            logger.warning("USE_OPENCL is enabled but no OpenCL device is available; using the CPU.")
+    return _opencl_state
+
 
 def average_brightness(region: Image.Image) -> float:
     """
@@ -19,11 +62,7 @@ def average_brightness(region: Image.Image) -> float:
 
     Brightness is computed as the mean of the grayscale values.
     """
-    grayscale = region.convert("L")
-    histogram = grayscale.histogram()
-    pixels = sum(histogram)
-    brightness = sum(i * histogram[i] for i in range(256)) / pixels
-    return brightness
+    return float(np.asarray(region.convert("L")).mean())
 
 
 def best_background_for_image(image: Image.Image, corner_size: int = 50) -> tuple[int, int, int]:
@@ -76,7 +115,15 @@ def is_image_good_quality(image: Image) -> bool:
     """
     Determine if the image quality is good based on noise level and sharpness.
     """
-    image_cv = np.array(image)
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    return _is_good_quality_np(np.asarray(image))
+
+
+def _is_good_quality_np(image_cv: np.ndarray) -> bool:
+    """
+    Determine if the image quality is good based on the noise level of its pixel array.
+    """
     noise_level = calculate_noise(image_cv)
 
     logger.debug(f'Noise level: {noise_level}')
@@ -88,7 +135,9 @@ def is_image_good_quality(image: Image) -> bool:
 def denoise_and_sharpen_image(
         image: Image,
         use_saturation_filter: bool = USE_SATURATION_FILTER,
-        saturation_factor: float = SATURATION_FACTOR
+        saturation_factor: float = SATURATION_FACTOR,
+        denoise_strength: float = 10,
+        sharpen_strength: float = 1.0
 ) -> Image:
     """
     Denoises and sharpens an image after cropping.
@@ -97,6 +146,8 @@ def denoise_and_sharpen_image(
     - image: The cropped image as a PIL Image.
     - use_saturation_filter: Whether to apply saturation enhancement.
     - saturation_factor: The factor by which to enhance saturation.
+    - denoise_strength: The strength of the denoising filter.
+    - sharpen_strength: The amount of the unsharp mask applied after denoising.
     """
     try:
         image_saturated = image
@@ -105,20 +156,48 @@ def denoise_and_sharpen_image(
             enhancer = ImageEnhance.Color(image_saturated)
             image_saturated = enhancer.enhance(saturation_factor)
 
+        # Zero-copy view, shared by the quality check and the filters (OpenCV does not write to its inputs)
+        if image_saturated.mode != 'RGB':
+            image_saturated = image_saturated.convert('RGB')
+        image_cv = np.asarray(image_saturated)
+
         # Check if the image is of good quality
-        if is_image_good_quality(image_saturated):
+        if _is_good_quality_np(image_cv):
             logger.info('Image quality is good; skipping denoising.')
             return image_saturated
 
-        # 1. Denoise the image using OpenCV (fastNlMeansDenoisingColored)
-        image_cv = np.array(image_saturated)
-        denoised_image = cv2.fastNlMeansDenoisingColored(image_cv, None, 10, 10, 7, 21)
+        # 1. Denoise the image using an edge-preserving OpenCV filter
+        is_large_image = image_cv.shape[0] * image_cv.shape[1] > _LARGE_IMAGE_PIXELS
+        if _opencl_enabled():
+            # Upload once, the filters below then run on the OpenCL device
+            image_cv = cv2.UMat(image_cv)
+
+        if _HAS_XIMGPROC:
+            # Guided filter, box filter based so its cost does not depend on the radius.
+            # eps is a variance on the 0-255 range, denoise_strength is taken as a percentage of that range
+            # (10 -> eps ~650), lower values leave most of the noise in place
+            denoised_image = cv2.ximgproc.guidedFilter(
+                guide=image_cv, src=image_cv, radius=4, eps=(denoise_strength * 255 / 100) ** 2
+            )
+        elif is_large_image:
+            # Recursive filter, its cost does not depend on the kernel size
+            denoised_image = cv2.edgePreservingFilter(image_cv, flags=cv2.RECURS_FILTER, sigma_s=60, sigma_r=0.4)
+        else:
+            denoised_image = cv2.bilateralFilter(
+                image_cv, d=5, sigmaColor=denoise_strength * 5, sigmaSpace=denoise_strength * 5
+            )
+
+        # 2. Sharpen the image with an unsharp mask (separable Gaussian blur + weighted difference)
+        blurred_image = cv2.GaussianBlur(denoised_image, (0, 0), sigmaX=1.0)
+        sharpened_image = cv2.addWeighted(
+            denoised_image, 1.0 + sharpen_strength, blurred_image, -sharpen_strength, 0
+        )
 
-        # Convert back to PIL for further processing
-        image_denoised = Image.fromarray(denoised_image)
+        if isinstance(sharpened_image, cv2.UMat):
+            sharpened_image = sharpened_image.get()
 
-        # 2. Sharpen the image using Pillow's built-in filter
-        image_sharpened = image_denoised.filter(ImageFilter.SHARPEN)
+        # Convert back to PIL
+        image_sharpened = Image.fromarray(sharpened_image)
 
         logger.info('Image denoised and sharpened.')
         return image_sharpened
@@ -127,6 +206,16 @@ def denoise_and_sharpen_image(
         return image
 
 
+def _channels_are_equal(img_np: np.ndarray) -> bool:
+    """
+    Check if the first three channels of an image array are identical (i.e. the image is grayscale).
+    """
+    return (
+        np.array_equal(img_np[..., 0], img_np[..., 1])
+        and np.array_equal(img_np[..., 1], img_np[..., 2])
+    )
+
+
 def is_not_manga(image: ImageFile) -> bool:
     """
     Detect if an image is likely from a manga or a web-comic/manhwa based on its aspect ratio and color content.
@@ -134,15 +223,22 @@ def is_not_manga(image: ImageFile) -> bool:
     try:
         width, height = image.size
         aspect_ratio = width / height
-        img_np = np.array(image, dtype=np.uint8)
+
+        # Palette and other modes do not expose their colors as pixel values, zero-copy views need RGB or L
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        img_np = np.asarray(image)
 
         is_colored = True
 
-        if len(img_np.shape) == 2:
+        if img_np.ndim == 2:
             is_colored = False
-        elif len(img_np.shape) == 3:
-            if np.all(img_np[:, :, 0] == img_np[:, :, 1]) and np.all(img_np[:, :, 1] == img_np[:, :, 2]):
-                is_colored = False
+        elif img_np.ndim == 3 and img_np.shape[2] >= 3:
+            # Check a downsampled view first, color is usually visible in any small sample
+            sample = img_np[::8, ::8]
+            if _channels_are_equal(sample):
+                # Confirm on the full image to avoid missing sparsely colored pages
+                is_colored = not _channels_are_equal(img_np)
 
         if aspect_ratio > 1.5 and is_colored:
             logger.info("Image classified as manga.")
@@ -158,20 +254,82 @@ def is_not_manga(image: ImageFile) -> bool:
         return False
 
 
+def _grayscale_np(image: Image.Image) -> np.ndarray:
+    """
+    Returns the grayscale pixels of an image as a NumPy array, avoiding copies for RGB and L images.
+    """
+    if image.mode == 'RGB':
+        return cv2.cvtColor(np.asarray(image), cv2.COLOR_RGB2GRAY)
+    elif image.mode == 'L':
+        return np.asarray(image)
+    return np.asarray(image.convert('L'))
+
+
+def _detect_spaces_np(grayscale_np: np.ndarray, threshold_light: int, threshold_dark: int) -> list[int]:
+    """
+    Returns the indexes of the rows of a grayscale array that are entirely blank or entirely dark.
+    """
+    # A row is blank if its darkest pixel is light, and dark if its lightest pixel is dark
+    row_min = grayscale_np.min(axis=1)
+    row_max = grayscale_np.max(axis=1)
+    spaces_mask = (row_min > threshold_light) | (row_max < threshold_dark)
+    return np.flatnonzero(spaces_mask).tolist()
+
+
+def _content_bbox(
+        grayscale_np: np.ndarray,
+        blank_threshold: int,
+        dark_threshold: int
+) -> tuple[int, int, int, int] | None:
+    """
+    Returns the (x0, y0, x1, y1) box enclosing every pixel that is neither blank nor dark, or None if there is none.
+    """
+    # Keep pixels that are neither blank nor dark, as a single uint8 mask (255 for content, 0 otherwise)
+    crop_mask = cv2.inRange(grayscale_np, dark_threshold, blank_threshold)
+
+    # Bounding box from row/column reductions instead of materializing every kept coordinate
+    rows_any = crop_mask.any(axis=1)
+    if not rows_any.any():
+        return None
+    y0 = int(rows_any.argmax())
+    y1 = len(rows_any) - int(rows_any[::-1].argmax())
+
+    # Rows outside [y0, y1) have no content, so only the content rows are reduced for the columns
+    cols_any = crop_mask[y0:y1].any(axis=0)
+    x0 = int(cols_any.argmax())
+    x1 = len(cols_any) - int(cols_any[::-1].argmax())
+    return x0, y0, x1, y1
+
+
+def _crop_segment(
+        image: Image.Image,
+        grayscale_np: np.ndarray,
+        y_start: int,
+        y_end: int,
+        blank_threshold: int = 240,
+        dark_threshold: int = 30
+) -> Image.Image:
+    """
+    Crops the blank or dark borders of the rows [y_start, y_end) of an image, given the grayscale array of the whole image.
+
+    The bounding box is computed on a view of the grayscale rows, and the image pixels are copied once by the final crop.
+    """
+    bbox = _content_bbox(grayscale_np[y_start:y_end], blank_threshold, dark_threshold)
+    if bbox is None:
+        logger.warning("No valid cropping region found, returning original image.")
+        return image.crop((0, y_start, image.width, y_end))
+
+    x0, y0, x1, y1 = bbox
+    logger.info("Image cropped by blank or dark spaces.")
+    return image.crop((x0, y_start + y0, x1, y_start + y1))
+
+
 def detect_blank_or_dark_spaces(image, threshold_light=240, threshold_dark=15):
     """
     Detects horizontal blank or dark spaces in an image by checking each row of pixels.
     """
     try:
-        spaces = []
-        width, height = image.size
-        grayscale_img = image.convert("L")
-
-        for y in range(height):
-            row = grayscale_img.crop((0, y, width, y + 1))
-            if all(pixel > threshold_light for pixel in row.getdata()) or all(
-                    pixel < threshold_dark for pixel in row.getdata()):
-                spaces.append(y)
+        spaces = _detect_spaces_np(_grayscale_np(image), threshold_light, threshold_dark)
 
         logger.info(f"Detected {len(spaces)} blank or dark spaces.")
         return spaces
@@ -185,18 +343,9 @@ def crop_image_by_blank_or_dark_space(image, blank_threshold=240, dark_threshold
     Crops the image by detecting regions of blank (white) or dark (black) space.
     """
     try:
-        grayscale_image = image.convert('L')
-        np_image = np.array(grayscale_image, dtype=np.uint8)
-
-        blank_mask = np_image > blank_threshold
-        dark_mask = np_image < dark_threshold
-        crop_mask = ~(blank_mask | dark_mask)
-
-        coords = np.argwhere(crop_mask)
-        if coords.size > 0:
-            y0, x0 = coords.min(axis=0)
-            y1, x1 = coords.max(axis=0) + 1
-            cropped_image = image.crop((x0, y0, x1, y1))
+        bbox = _content_bbox(_grayscale_np(image), blank_threshold, dark_threshold)
+        if bbox is not None:
+            cropped_image = image.crop(bbox)
             logger.info("Image cropped by blank or dark spaces.")
         else:
             logger.warning("No valid cropping region found, returning original image.")
@@ -233,8 +382,18 @@ def enhance_image_for_screen(img, screen_width=FINAL_DOCUMENT_WIDTH, screen_heig
             new_height = screen_height
             new_width = max(1, int(screen_height * img_aspect_ratio))  # Avoid zero/negative width
 
+        # Pre-shrink large downscales with a cheap integer box reduction, LANCZOS only does the remainder
+        scale = max(img_width / new_width, img_height / new_height)
+        if scale >= 2 and img.mode not in ('1', 'P'):
+            img = img.reduce(int(scale))
+
         resized_img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
 
+        # The resized image already covers the whole screen, no background is needed
+        if (new_width, new_height) == (screen_width, screen_height):
+            logger.info("Image enhanced for screen.")
+            return resized_img if resized_img.mode == "RGB" else resized_img.convert("RGB")
+
         # Create a new image with the screen size and background color matching the best background for the image
         new_img = Image.new(
             mode="RGB", size=(screen_width, screen_height), color=best_background_for_image(resized_img)
@@ -263,7 +422,11 @@ def split_image_by_blank_or_dark_spaces(
     Splits an image into segments wherever horizontal blank spaces are found
     """
     try:
-        blank_spaces = detect_blank_or_dark_spaces(image, threshold_light, threshold_dark)
+        # Convert to grayscale once, segments are sliced as views of the same buffer
+        grayscale_np = _grayscale_np(image)
+
+        blank_spaces = _detect_spaces_np(grayscale_np, threshold_light, threshold_dark)
+        logger.info(f"Detected {len(blank_spaces)} blank or dark spaces.")
         split_positions = [0] + blank_spaces + [image.height]
 
         cropped_images = []
@@ -271,9 +434,9 @@ def split_image_by_blank_or_dark_spaces(
         for i in range(1, len(split_positions)):
             try:
                 if split_positions[i] - split_positions[i - 1] > min_gap:
-                    segment = image.crop((0, split_positions[i - 1], image.width, split_positions[i]))
+                    y_start, y_end = split_positions[i - 1], split_positions[i]
 
-                    segment_cropped = crop_image_by_blank_or_dark_space(segment)
+                    segment_cropped = _crop_segment(image, grayscale_np, y_start, y_end)
                     segment_enhanced = enhance_image_for_screen(segment_cropped)
                     cropped_images.append(segment_enhanced)
             except IndexError:
@@ -310,60 +473,103 @@ def delete_images_in_folder(folder_path, extensions=("png", "jpg", "jpeg", "bmp"
     Delete all image files in a folder. Images are detected by their file extensions.
     """
     try:
-        files = os.listdir(folder_path)
-
-        for file in files:
-            file_path = os.path.join(folder_path, file)
-
-            if file.lower().endswith(extensions) and os.path.isfile(file_path):
-                os.remove(file_path)
-                logger.info(f"Deleted image: {file}")
+        # Extensions are accepted with or without their leading dot (e.g. settings.IMAGE_EXTENSIONS)
+        extensions_set = frozenset(extension.lower().lstrip('.') for extension in extensions)
+
+        # scandir entries cache the file type, avoiding an extra stat per file
+        with os.scandir(folder_path) as entries:
+            for entry in entries:
+                if entry.name.rpartition('.')[2].lower() in extensions_set and entry.is_file(follow_symlinks=False):
+                    os.remove(entry.path)
+                    logger.info(f"Deleted image: {entry.name}")
     except Exception as e:
         logger.error(f"Error deleting images in folder {folder_path}: {e}", exc_info=True)
 
 
-def temporal_pdf_image(image_path: str, width: int, height: int) -> str:
-    with Image.open(image_path) as img:
-        image_path = image_path.split('.')[0]
-        img = img.convert('RGB')  # Ensure it's in RGB format
-
-        # Resize the image to fit A4 size while maintaining aspect ratio
-        img_width, img_height = img.size
-        aspect = img_width / img_height
-
-        if aspect > 1:  # Wide image
-            new_width = width
-            new_height = width / aspect
-        else:  # Tall image
-            new_height = height
-            new_width = height * aspect
-
-        img = img.resize((int(new_width), int(new_height)), Image.Resampling.LANCZOS)
+def _encode_jpeg(image: Image.Image, quality: int) -> bytes:
+    """
+    Encode an image as JPEG bytes with OpenCV's libjpeg-turbo backed encoder.
+    """
+    if image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+
+    # OpenCV expects BGR channel order
+    image_np = np.asarray(image)
+    if image.mode == 'RGB':
+        image_np = cv2.cvtColor(image_np, cv2.COLOR_RGB2BGR)
+
+    is_encoded, encoded_image = cv2.imencode(
+        '.jpg', image_np, [cv2.IMWRITE_JPEG_QUALITY, quality, cv2.IMWRITE_JPEG_OPTIMIZE, 0]
+    )
+    if not is_encoded:
+        raise ValueError("OpenCV failed to encode the image as JPEG.")
+    return encoded_image.tobytes()
+
+
+def batch_temporal_pdf(
+        image_paths: list[str],
+        width: int,
+        height: int,
+        pdf_path: str | None = None
+) -> str | None:
+    """
+    Resize a list of images to fit the given page size and write them as the pages of a single PDF.
 
-        # Save the image to a temporary file and draw on canvas
-        temp_img_path = f"{image_path}.pdf"
-        img.save(temp_img_path, "PDF", quality=85)
+    The images are JPEG encoded once and embedded as-is by img2pdf, without re-encoding.
+    By default the PDF is written next to the first image, with the same name and a .pdf extension.
+    """
+    if not image_paths:
+        logger.warning("No images given to build the temporal PDF.")
+        return None
 
-        return temp_img_path
+    try:
+        if pdf_path is None:
+            pdf_path = f"{os.path.splitext(image_paths[0])[0]}.pdf"
+
+        jpeg_pages = []
+        for image_path in image_paths:
+            with Image.open(image_path) as img:
+                img = img.convert('RGB')  # Ensure it's in RGB format
+
+                # Resize the image to fit the page size while maintaining aspect ratio
+                img_width, img_height = img.size
+                aspect = img_width / img_height
+
+                if aspect > 1:  # Wide image
+                    new_width = width
+                    new_height = width / aspect
+                else:  # Tall image
+                    new_height = height
+                    new_width = height * aspect
+
+                img = img.resize((max(1, int(new_width)), max(1, int(new_height))), Image.Resampling.LANCZOS)
+                jpeg_pages.append(_encode_jpeg(img, quality=85))
+
+        layout_fun = img2pdf.get_layout_fun(pagesize=(width, height))
+        with open(pdf_path, 'wb') as pdf_file:
+            pdf_file.write(img2pdf.convert(jpeg_pages, layout_fun=layout_fun))
+
+        logger.info(f"Saved temporal PDF with {len(jpeg_pages)} pages to {pdf_path}.")
+        return pdf_path
+    except Exception as e:
+        logger.error(f"Error creating temporal PDF {pdf_path}: {e}", exc_info=True)
+        return None
 
 
-def load_images_list_by_path(
-        *,
-        image_files_paths: list[str],
-        image_folder_path: str
-) -> list[Image]:
+def _decode_fast(image_file_path: str) -> Image.Image:
     """
-    Load images from a list of paths.
+    Decode an image file to RGB, using libjpeg-turbo for JPEG files when it is available.
     """
-    images = []
-    try:
-        for image_path in image_files_paths:
-            full_path = os.path.join(image_folder_path, image_path)
-            images.append(Image.open(full_path).convert('RGB'))
-            logger.info(f"Loaded image: {image_path}")
-    except Exception as e:
-        logger.error(f"Error loading images from path {image_folder_path}: {e}", exc_info=True)
-    return images
+    if _turbo_jpeg is not None and image_file_path.lower().endswith(('.jpg', '.jpeg')):
+        try:
+            with open(image_file_path, 'rb') as image_file:
+                image_np = _turbo_jpeg.decode(image_file.read(), pixel_format=TJPF_RGB)
+            return Image.fromarray(image_np)
+        except Exception as e:
+            logger.warning(f"Fast JPEG decoding failed for {image_file_path}, falling back to Pillow: {e}")
+
+    with Image.open(image_file_path) as image:
+        return image.convert('RGB')
 
 
 def load_image_by_path(
@@ -373,7 +579,7 @@ def load_image_by_path(
     Load a single image by its path.
     """
     try:
-        image = Image.open(image_file_path).convert('RGB')
+        image = _decode_fast(image_file_path)
         logger.info(f"Loaded image: {image_file_path}")
         return image
     except Exception as e:
@@ -399,7 +605,10 @@ def save_image_to_path(image: ImageFile, path_to_save: str, quality=75):
     Save an image to a specified path with a given quality.
     """
     try:
-        image.save(path_to_save, format='JPEG', quality=quality)
+        encoded_image = _encode_jpeg(image, quality)
+
+        with open(path_to_save, 'wb') as image_file:
+            image_file.write(encoded_image)
         logger.info(f"Saved image to {path_to_save}.")
     except Exception as e:
         logger.error(f"Error saving image to {path_to_save}: {e}", exc_info=True)
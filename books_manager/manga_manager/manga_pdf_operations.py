@@ -1,21 +1,27 @@
 import gc
 import logging
+import multiprocessing
 import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from io import BytesIO
+from logging.handlers import QueueHandler
 
 import fitz
 from natsort import natsorted
+from PIL import Image
 from pymupdf import Document
 from reportlab.lib.utils import ImageReader
 from reportlab.pdfgen import canvas
 
 from manga_manager.manga_images_operations import (
-    load_image_by_str_data, split_and_crop_image, load_image_by_path
+    load_image_by_str_data, split_and_crop_image, load_image_by_path, limit_worker_threads
 )
 from settings import (
     FINAL_DOCUMENT_WIDTH,
     FINAL_DOCUMENT_HEIGHT,
-    IMAGE_QUALITY
+    IMAGE_QUALITY,
+    PAGE_PROCESSING_WORKERS
 )
 
 logger = logging.getLogger('_books_manager_')
@@ -43,8 +49,112 @@ def doc_pages_generator(doc: Document):
                 continue
 
 
+def doc_images_generator(doc: Document):
+    """Generator to yield decoded images from the PDF."""
+    for page_num, img_index, image_data in doc_pages_generator(doc):
+        image = load_image_by_str_data(image_data=image_data)
+        if image is not None:
+            yield page_num, img_index, image
+
+
+def folder_images_generator(image_folder_path: str, image_files: list[str]):
+    """Generator to yield decoded images from a folder, in the given file order, with their index in image_files."""
+    for file_index, image_file in enumerate(image_files):
+        image = load_image_by_path(os.path.join(image_folder_path, image_file))
+        if image is not None:
+            yield 0, file_index, image
+
+
+def _split_and_crop_raw_image(
+        page_num: int,
+        img_index: int,
+        mode: str,
+        size: tuple[int, int],
+        data: bytes
+) -> list[tuple[str, tuple[int, int], bytes]]:
+    """
+    Worker entry point: rebuild the image from its raw pixels, split and crop it, and return the raw
+    pixels of every resulting image.
+    """
+    image = Image.frombytes(mode, size, data)
+    return [
+        (split_image.mode, split_image.size, split_image.tobytes())
+        for split_image in split_and_crop_image(image, page_num, img_index)
+    ]
+
+
+def _init_page_worker(log_queue, log_level: int) -> None:
+    """
+    Page worker initializer: forward the worker log records to the main process and limit its native threads.
+    """
+    if log_queue is not None:
+        logger.addHandler(QueueHandler(log_queue))
+        logger.setLevel(log_level)
+    limit_worker_threads()
+
+
+def create_page_executor(max_workers: int = PAGE_PROCESSING_WORKERS, log_queue=None) -> ProcessPoolExecutor:
+    """
+    Create the process pool used to split and crop pages.
+
+    Workers are spawned instead of forked, since the pool is created from a process that already runs threads,
+    and each worker is limited to a single native thread. When log_queue is given, the workers send their log
+    records to it (with the current logger level) so the main process can write them through a QueueListener.
+    """
+    return ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_page_worker,
+        initargs=(log_queue, logger.getEffectiveLevel())
+    )
+
+
+def process_pages(pages_iter, page_executor: ProcessPoolExecutor | None = None, max_in_flight: int | None = None):
+    """
+    Split and crop the images yielded by pages_iter in a process pool.
+
+    Yields (page_num, img_index, split_images) in the same order as the input. At most max_in_flight pages
+    (2 * PAGE_PROCESSING_WORKERS by default) are in flight at any time, so memory usage stays bounded
+    regardless of the document size. When page_executor is None a pool is created for this call only.
+
+    Failures of the pool itself, like a killed worker, are raised so the document is not saved incomplete.
+    """
+    if page_executor is None:
+        with create_page_executor() as executor:
+            yield from process_pages(pages_iter, executor, max_in_flight)
+        return
+
+    if max_in_flight is None:
+        max_in_flight = 2 * PAGE_PROCESSING_WORKERS
+    in_flight = deque()
+
+    def collect():
+        # Page errors are already handled inside the worker, so anything raised here is a pool failure
+        # (e.g. BrokenProcessPool) and must propagate instead of silently dropping pages from the document
+        page_num, img_index, future = in_flight.popleft()
+        split_images = [Image.frombytes(mode, size, data) for mode, size, data in future.result()]
+        return page_num, img_index, split_images
+
+    for page_num, img_index, image in pages_iter:
+        with image:
+            # Only raw pixels cross the process boundary, so palette-based modes are expanded first
+            if image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+            future = page_executor.submit(
+                _split_and_crop_raw_image, page_num, img_index, image.mode, image.size, image.tobytes()
+            )
+        in_flight.append((page_num, img_index, future))
+
+        if len(in_flight) >= max_in_flight:
+            yield collect()
+
+    while in_flight:
+        yield collect()
+
+
 def process_pdf(pdf_path: str, new_pdf_path: str, screen_width=FINAL_DOCUMENT_WIDTH,
-                screen_height=FINAL_DOCUMENT_HEIGHT, image_quality_=IMAGE_QUALITY):
+                screen_height=FINAL_DOCUMENT_HEIGHT, image_quality_=IMAGE_QUALITY,
+                page_executor: ProcessPoolExecutor | None = None, max_pages_in_flight: int | None = None):
     """
     Process PDF file: Extract images, split, crop and save them into a new PDF.
     """
@@ -61,34 +171,32 @@ def process_pdf(pdf_path: str, new_pdf_path: str, screen_width=FINAL_DOCUMENT_WI
 
             c = canvas.Canvas(new_pdf_path, pagesize=(screen_width, screen_height))
 
-            for page_num, img_index, image_data in doc_pages_generator(doc):
+            for page_num, img_index, split_images in process_pages(
+                    doc_images_generator(doc), page_executor, max_pages_in_flight
+            ):
                 logger.info(f"Processing image {img_index} on page {page_num}.")
                 try:
-                    with load_image_by_str_data(image_data=image_data) as image:
-                        split_images = split_and_crop_image(image, page_num, img_index)
-                        for split_image in split_images:
-                            # Create an in-memory bytes object
-                            image_buffer = BytesIO()
-                            # Save the PIL image to buffer in JPEG format (or appropriate format)
-                            split_image.save(image_buffer, format='JPEG', optimize=True, quality=image_quality_)
-                            image_buffer.seek(0)  # Seek to the start of the BytesIO object
+                    for split_image in split_images:
+                        # Create an in-memory bytes object
+                        image_buffer = BytesIO()
+                        # Save the PIL image to buffer in JPEG format (or appropriate format)
+                        split_image.save(image_buffer, format='JPEG', optimize=True, quality=image_quality_)
+                        image_buffer.seek(0)  # Seek to the start of the BytesIO object
 
-                            # Convert the BytesIO object to an ImageReader object that ReportLab can understand
-                            image_reader = ImageReader(image_buffer)
+                        # Convert the BytesIO object to an ImageReader object that ReportLab can understand
+                        image_reader = ImageReader(image_buffer)
 
-                            # Draw the image on the PDF at position (x, y) with specified width and height
-                            c.drawImage(image_reader, x=0, y=0, width=screen_width, height=screen_height)
+                        # Draw the image on the PDF at position (x, y) with specified width and height
+                        c.drawImage(image_reader, x=0, y=0, width=screen_width, height=screen_height)
 
-                            # Start a new page after each image
-                            c.showPage()
+                        # Start a new page after each image
+                        c.showPage()
 
-                            # Close the image buffer
-                            image_buffer.close()
+                        # Close the image buffer
+                        image_buffer.close()
 
-                            # Close the split image
-                            split_image.close()
-
-                        image.close()
+                        # Close the split image
+                        split_image.close()
                 except Exception as e:
                     logger.error(f"Error processing image {img_index} on page {page_num}: {e}")
 
@@ -106,7 +214,8 @@ def process_pdf(pdf_path: str, new_pdf_path: str, screen_width=FINAL_DOCUMENT_WI
 
 
 def process_image_folder(image_folder_path: str, new_pdf_path: str, screen_width=FINAL_DOCUMENT_WIDTH,
-                         screen_height=FINAL_DOCUMENT_HEIGHT, image_quality_=IMAGE_QUALITY):
+                         screen_height=FINAL_DOCUMENT_HEIGHT, image_quality_=IMAGE_QUALITY,
+                         page_executor: ProcessPoolExecutor | None = None, max_pages_in_flight: int | None = None):
     """
     Process a folder of images and save them into a new PDF.
     """
@@ -121,30 +230,24 @@ def process_image_folder(image_folder_path: str, new_pdf_path: str, screen_width
 
     c = canvas.Canvas(new_pdf_path, pagesize=(screen_width, screen_height))
 
-    for image_file in image_files:
-        image_path = os.path.join(image_folder_path, image_file)
+    for _, file_index, split_images in process_pages(
+            folder_images_generator(image_folder_path, image_files), page_executor, max_pages_in_flight
+    ):
         try:
-            with load_image_by_path(image_path) as img:
-                img = img.convert("RGB")
-
-                # Split and crop the image if needed
-                split_images = split_and_crop_image(img, 0, 0)
-                for split_image in split_images:
-                    image_buffer = BytesIO()
-                    split_image.save(image_buffer, format='JPEG', optimize=True, quality=image_quality_)
-                    image_buffer.seek(0)
+            for split_image in split_images:
+                image_buffer = BytesIO()
+                split_image.save(image_buffer, format='JPEG', optimize=True, quality=image_quality_)
+                image_buffer.seek(0)
 
-                    image_reader = ImageReader(image_buffer)
-                    c.drawImage(image_reader, x=0, y=0, width=screen_width, height=screen_height)
-                    c.showPage()
+                image_reader = ImageReader(image_buffer)
+                c.drawImage(image_reader, x=0, y=0, width=screen_width, height=screen_height)
+                c.showPage()
 
-                    image_buffer.close()
-                    split_image.close()
-
-            img.close()
+                image_buffer.close()
+                split_image.close()
 
         except Exception as e:
-            logger.error(f"Error processing image {image_file}: {e}")
+            logger.error(f"Error processing image {image_files[file_index]}: {e}")
 
         gc.collect()  # Trigger garbage collection after each image
 
@@ -152,16 +255,27 @@ def process_image_folder(image_folder_path: str, new_pdf_path: str, screen_width
     logger.info(f"Image folder processed and saved to PDF: {new_pdf_path}")
 
 
-def split_crop_save_images_to_pdf(input_path: str, new_pdf_path: str):
+def split_crop_save_images_to_pdf(
+        input_path: str,
+        new_pdf_path: str,
+        page_executor: ProcessPoolExecutor | None = None,
+        max_pages_in_flight: int | None = None
+):
     """
     Determine if the input path is a folder (with images) or a PDF file,
     and process it accordingly.
+
+    The pages are split and cropped in page_executor when given, so several documents can share one process pool.
     """
     if os.path.isdir(input_path):
         logger.info(f"Processing folder with images: {input_path}")
-        process_image_folder(input_path, new_pdf_path)
+        process_image_folder(
+            input_path, new_pdf_path, page_executor=page_executor, max_pages_in_flight=max_pages_in_flight
+        )
     elif os.path.isfile(input_path) and input_path.lower().endswith('.pdf'):
         logger.info(f"Processing PDF file: {input_path}")
-        process_pdf(input_path, new_pdf_path)
+        process_pdf(
+            input_path, new_pdf_path, page_executor=page_executor, max_pages_in_flight=max_pages_in_flight
+        )
     else:
         logger.error(f"Invalid input path: {input_path}. Must be a folder with images or a PDF file.")
@@ -1,5 +1,6 @@
 import logging
 import os
+from concurrent.futures import ProcessPoolExecutor
 
 from common.epub_operations import convert_pdf_to_epub
 from common.files_operations import get_file_size
@@ -13,7 +14,12 @@ from manga_manager.manga_str_operations import (
 logger = logging.getLogger('_books_manager_')
 
 
-def process_manga(file_path: str, destiny_folder_path: str) -> None:
+def process_manga(
+        file_path: str,
+        destiny_folder_path: str,
+        page_executor: ProcessPoolExecutor | None = None,
+        max_pages_in_flight: int | None = None
+) -> None:
     try:
         # Create output folder path, file name and extracts manga name from file name
         file_name_with_extension = os.path.basename(file_path)
@@ -42,6 +48,8 @@ def process_manga(file_path: str, destiny_folder_path: str) -> None:
         split_crop_save_images_to_pdf(
             input_path=file_path,  # Can be a PDF file or a folder containing images
             new_pdf_path=new_pdf_path,
+            page_executor=page_executor,
+            max_pages_in_flight=max_pages_in_flight,
         )
 
         # Clean up: delete original file (PDF or folder)
@@ -1,3 +1,4 @@
+import multiprocessing
 import os
 
 from dotenv import load_dotenv
@@ -33,12 +34,20 @@ FINAL_DOCUMENT_WIDTH: int = get_env_var('FINAL_DOCUMENT_WIDTH', '1200', int) //
 FINAL_DOCUMENT_HEIGHT: int = get_env_var('FINAL_DOCUMENT_HEIGHT', '1600', int) // 2
 IMAGE_QUALITY: int = get_env_var('IMAGE_QUALITY', '80', int)
 
+# Number of worker processes, shared by all the documents, used to split and crop pages
+PAGE_PROCESSING_WORKERS: int = max(1, get_env_var('PAGE_PROCESSING_WORKERS', str(os.cpu_count() or 1), int))
+
 # Control saturation filter with these variables
 USE_SATURATION_FILTER: bool = (
     os.getenv('USE_SATURATION_FILTER', 'false').strip().lower() in ['true', '1', 't', 'y', 'yes']
 )
 SATURATION_FACTOR: float = get_env_var('SATURATION_FACTOR', '1.5', float)
 
+# Run the denoise and sharpen filters on an OpenCL device through OpenCV (each page worker creates its own context)
+USE_OPENCL: bool = (
+    os.getenv('USE_OPENCL', 'false').strip().lower() in ['true', '1', 't', 'y', 'yes']
+)
+
 # Control creating extra epub file version
 CREATE_EPUB_FILES: bool = (
     os.getenv('CREATE_EPUB_FILES', 'false').strip().lower() in ['true', '1', 't', 'y', 'yes']
@@ -47,13 +56,16 @@ CREATE_EPUB_FILES: bool = (
 # Initialize a dictionary for file size comparison
 file_size_comparison: dict[str, int] = {}
 
-# Log loaded configuration (optional)
-print(f"Loaded configuration:\n"
-      f"  INPUT_MANGAS_FOLDER_PATH: {INPUT_MANGAS_FOLDER_PATH}\n"
-      f"  OUTPUT_MANGAS_FOLDER_PATH: {OUTPUT_MANGAS_FOLDER_PATH}\n"
-      f"  NOISE_THRESHOLD: {NOISE_THRESHOLD}\n"
-      f"  FINAL_DOCUMENT_WIDTH: {FINAL_DOCUMENT_WIDTH}\n"
-      f"  FINAL_DOCUMENT_HEIGHT: {FINAL_DOCUMENT_HEIGHT}\n"
-      f"  IMAGE_QUALITY: {IMAGE_QUALITY}\n"
-      f"  USE_SATURATION_FILTER: {USE_SATURATION_FILTER}\n"
-      f"  SATURATION_FACTOR: {SATURATION_FACTOR}\n")
+# Log loaded configuration (optional), only once from the main process and not from every page worker
+if multiprocessing.parent_process() is None:
+    print(f"Loaded configuration:\n"
+          f"  INPUT_MANGAS_FOLDER_PATH: {INPUT_MANGAS_FOLDER_PATH}\n"
+          f"  OUTPUT_MANGAS_FOLDER_PATH: {OUTPUT_MANGAS_FOLDER_PATH}\n"
+          f"  NOISE_THRESHOLD: {NOISE_THRESHOLD}\n"
+          f"  FINAL_DOCUMENT_WIDTH: {FINAL_DOCUMENT_WIDTH}\n"
+          f"  FINAL_DOCUMENT_HEIGHT: {FINAL_DOCUMENT_HEIGHT}\n"
+          f"  IMAGE_QUALITY: {IMAGE_QUALITY}\n"
+          f"  PAGE_PROCESSING_WORKERS: {PAGE_PROCESSING_WORKERS}\n"
+          f"  USE_SATURATION_FILTER: {USE_SATURATION_FILTER}\n"
+          f"  SATURATION_FACTOR: {SATURATION_FACTOR}\n"
+          f"  USE_OPENCL: {USE_OPENCL}\n")